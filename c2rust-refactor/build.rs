@@ -34,26 +34,8 @@ fn main() {
     process_ast("ast_names", &out_dir.join("ast_names_gen.inc.rs"));
     process_ast("lua_ast_node", &out_dir.join("lua_ast_node_gen.inc.rs"));
 
-    process_ast(
-        "rewrite_rewrite",
-        &out_dir.join("rewrite_rewrite_gen.inc.rs"),
-    );
-    process_ast(
-        "rewrite_recursive",
-        &out_dir.join("rewrite_recursive_gen.inc.rs"),
-    );
-    process_ast(
-        "rewrite_recover_children",
-        &out_dir.join("rewrite_recover_children_gen.inc.rs"),
-    );
-    process_ast(
-        "rewrite_seq_item",
-        &out_dir.join("rewrite_seq_item_gen.inc.rs"),
-    );
-    process_ast(
-        "rewrite_maybe_rewrite_seq",
-        &out_dir.join("rewrite_maybe_rewrite_seq_gen.inc.rs"),
-    );
+    // Produces all five `rewrite_*_gen.inc.rs` files in one pass.
+    process_ast("rewrite_all", out_dir);
 
     println!("cargo:rerun-if-changed=gen/");
     for entry in fs::read_dir(&"gen").unwrap() {
@@ -1,16 +1,36 @@
 from collections import namedtuple
+import functools
 
-Enum = namedtuple('Enum', ('name', 'variants', 'attrs'))
-Struct = namedtuple('Struct', ('name', 'fields', 'is_tuple', 'attrs'))
-Flag = namedtuple('Flag', ('name', 'attrs'))
-Field = namedtuple('Field', ('name', 'attrs'))
 
+class Node:
+    '''Mixin for AST node types (declarations and their fields).  Nodes hash
+    and compare by identity rather than by value (their `attrs` are dicts,
+    which aren't hashable), so they can be used as keys for
+    `functools.lru_cache` and friends.'''
+    __slots__ = ()
+    __hash__ = object.__hash__
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
 
+class Enum(Node, namedtuple('Enum', ('name', 'variants', 'attrs'))):
+    __slots__ = ()
+
+class Struct(Node, namedtuple('Struct', ('name', 'fields', 'is_tuple', 'attrs'))):
+    __slots__ = ()
+
+class Flag(Node, namedtuple('Flag', ('name', 'attrs'))):
+    __slots__ = ()
+
+class Field(Node, namedtuple('Field', ('name', 'attrs'))):
+    __slots__ = ()
+
+
+@functools.lru_cache(None)
 def variants_paths(se):
     if isinstance(se, Enum):
-        return [(v, '%s::%s' % (se.name, v.name)) for v in se.variants]
+        return tuple((v, '%s::%s' % (se.name, v.name)) for v in se.variants)
     elif isinstance(se, Struct):
-        return [(se, se.name)]
+        return ((se, se.name),)
     else:
         raise TypeError('expected Struct or Enum')
 
@@ -17,7 +17,6 @@ Attributes:
 - `#[equiv_mode=custom]`: On a type declaration, do not generate an `impl`.
 '''
 
-from datetime import datetime
 from textwrap import indent, dedent
 
 from ast import *
@@ -88,8 +87,7 @@ def ignore_impl(d):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
 
     for d in decls:
@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from ast import *
 from util import *
 
@@ -26,8 +24,7 @@ def do_ast_names_impl(d):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
 
     for d in decls:
@@ -15,7 +15,6 @@ Attributes:
   struct has a field named `id`.
 '''
 
-from datetime import datetime
 from textwrap import indent, dedent
 
 from ast import *
@@ -61,8 +60,7 @@ def find_id_field(s):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
 
     for d in decls:
@@ -18,7 +18,6 @@ Attributes:
   The field name can be omitted, in which case it defaults to `attrs`.
 '''
 
-from datetime import datetime
 from textwrap import indent, dedent
 
 from ast import *
@@ -59,8 +58,7 @@ def find_span_field(s):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
 
     for d in decls:
@@ -14,7 +14,6 @@ Attributes:
 - `#[to_lua_custom]`: implements `ToLuaExt` and `UserData` separately.
 '''
 
-from datetime import datetime
 from textwrap import indent, dedent
 
 from ast import *
@@ -251,8 +250,7 @@ def do_impl(s, kind_map):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
     yield '/// Refactoring module'
     yield '// @module Refactor'
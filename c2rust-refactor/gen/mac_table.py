@@ -30,7 +30,6 @@ Attributes:
   will be provided elsewhere.
 '''
 
-from datetime import datetime
 from textwrap import indent
 
 from ast import *
@@ -79,8 +78,7 @@ def do_collect_macros_impl(d):
 
 @linewise
 def generate(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
+    yield GENERATED_HEADER
     yield ''
 
     for d in decls:
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 from collections import namedtuple
+import os
 import re
 import sys
 
@@ -205,59 +206,52 @@ def parse(s):
 if __name__ == '__main__':
     decls = parse(open('gen/ast.txt').read())
 
-    mode, out_file = sys.argv[1:]
+    mode, out_path = sys.argv[1:]
 
+    # Each mode produces `outputs`, a dict mapping output file paths to their
+    # contents.
     if mode == 'ast_deref':
         import ast_deref
-        text = ast_deref.generate(decls)
+        outputs = {out_path: ast_deref.generate(decls)}
     elif mode == 'ast_equiv':
         import ast_equiv
-        text = ast_equiv.generate(decls)
+        outputs = {out_path: ast_equiv.generate(decls)}
     elif mode == 'matcher':
         import matcher
-        text = matcher.generate(decls)
+        outputs = {out_path: matcher.generate(decls)}
     elif mode == 'get_span':
         import get_span
-        text = get_span.generate(decls)
+        outputs = {out_path: get_span.generate(decls)}
     elif mode == 'get_node_id':
         import get_node_id
-        text = get_node_id.generate(decls)
+        outputs = {out_path: get_node_id.generate(decls)}
     elif mode == 'lr_expr':
         import lr_expr
-        text = lr_expr.generate(decls)
+        outputs = {out_path: lr_expr.generate(decls)}
     elif mode == 'list_node_ids':
         import list_node_ids
-        text = list_node_ids.generate(decls)
-    elif mode == 'rewrite_rewrite':
+        outputs = {out_path: list_node_ids.generate(decls)}
+    elif mode == 'rewrite_all':
+        # `out_path` is a directory; write one file per impl kind into it.
         import rewrite
-        text = rewrite.generate_rewrite_impls(decls)
-    elif mode == 'rewrite_recursive':
-        import rewrite
-        text = rewrite.generate_recursive_impls(decls)
-    elif mode == 'rewrite_recover_children':
-        import rewrite
-        text = rewrite.generate_recover_children_impls(decls)
-    elif mode == 'rewrite_seq_item':
-        import rewrite
-        text = rewrite.generate_seq_item_impls(decls)
-    elif mode == 'rewrite_maybe_rewrite_seq':
-        import rewrite
-        text = rewrite.generate_maybe_rewrite_seq_impls(decls)
+        outputs = {os.path.join(out_path, 'rewrite_%s_gen.inc.rs' % key): text
+                for key, text in rewrite.generate_all_impls(decls).items()}
     elif mode == 'mac_table':
         import mac_table
-        text = mac_table.generate(decls)
+        outputs = {out_path: mac_table.generate(decls)}
     elif mode == 'nt_match':
         import nt_match
-        text = nt_match.generate(decls)
+        outputs = {out_path: nt_match.generate(decls)}
     elif mode == 'ast_names':
         import ast_names
-        text = ast_names.generate(decls)
+        outputs = {out_path: ast_names.generate(decls)}
     elif mode == 'lua_ast_node':
         import lua_ast_node
-        text = lua_ast_node.generate(decls)
+        outputs = {out_path: lua_ast_node.generate(decls)}
     else:
         raise ValueError('unknown mode: %r' % mode)
 
-    with open(out_file, 'w') as f:
-        f.write(text)
-        f.write('\n')
+    for path, text in outputs.items():
+        with open(path, 'w') as f:
+            f.write(text)
+            f.write('\n')
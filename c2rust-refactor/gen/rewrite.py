@@ -143,9 +143,11 @@ These affect the behavior of generated `Recursive` and `RecoverChildren` impls.
   exprs in function-call callee positions.
 '''
 
-from datetime import datetime
+from collections import OrderedDict
+import functools
+import io
 import re
-from textwrap import indent, dedent
+import sys
 
 from ast import *
 from get_node_id import has_get_node_id_impl
@@ -153,6 +155,9 @@ from get_span import has_get_span_impl
 from util import *
 
 
+SELF_FIELD_RE = re.compile(r'\bself.([a-zA-Z0-9_]+)\b')
+
+@functools.lru_cache(None)
 def prec_name_to_expr(name, inc):
     inc_str = '' if not inc else ' + 1'
     if name.isupper():
@@ -163,6 +168,7 @@ def prec_name_to_expr(name, inc):
         # If some letters are lowercase, it's an AssocOp variant name.
         return 'parser::AssocOp::%s.precedence() as i8%s' % (name, inc_str)
 
+@functools.lru_cache(None)
 def field_prec_expr(f, first, suffix='1'):
     # First, figure out the "normal" precedence expression.
     prec_val = 'parser::PREC_RESET'
@@ -193,7 +199,7 @@ def field_prec_expr(f, first, suffix='1'):
     ctor = f.attrs.get('prec_special', 'Normal')
     return 'ExprPrec::%s(%s)' % (ctor, prec_val)
 
-SELF_FIELD_RE = re.compile(r'\bself.([a-zA-Z0-9_]+)\b')
+@functools.lru_cache(None)
 def rewrite_field_expr(expr, fmt):
     def repl(m):
         # If `self.foo` has type `T`, then the local variable `foo1` has type
@@ -202,29 +208,67 @@ def rewrite_field_expr(expr, fmt):
         return '(*%s)' % var_name
     return SELF_FIELD_RE.sub(repl, expr)
 
-DEFAULT_GEN_TRAITS = {'Rewrite', 'MaybeRewriteSeq', 'RecoverChildren'}
-DEFAULT_STRUCT_ENUM_GEN_TRAITS = {'Recursive'}
-
+DEFAULT_GEN_TRAITS = frozenset(('Rewrite', 'MaybeRewriteSeq', 'RecoverChildren'))
+DEFAULT_STRUCT_ENUM_GEN_TRAITS = frozenset(('Recursive',))
+
+def _split_attr(attrs, key, ty):
+    value = attrs.get(key)
+    if value is None:
+        return None
+    # Intern the names, so that comparing them against the (already interned)
+    # trait and strategy literals in this module is an identity check.
+    return ty(map(sys.intern, value.split(',')))
+
+class RewriteAttrs:
+    '''The rewrite-related attributes of a decl, parsed once from its `attrs`
+    dict.  Trait lists are stored as frozensets, and strategy lists as tuples
+    (order matters); either is `None` if the attribute is absent.'''
+    __slots__ = ('rewrite_ignore', 'rewrite_gen', 'rewrite_skip',
+            'rewrite_custom', 'rewrite_strategies', 'rewrite_extra_strategies',
+            'rewrite_seq_item', 'rewrite_print', 'rewrite_print_recover',
+            'prec_contains_expr', 'no_debug')
+
+    def __init__(self, attrs):
+        self.rewrite_ignore = 'rewrite_ignore' in attrs
+        self.rewrite_seq_item = 'rewrite_seq_item' in attrs
+        self.rewrite_print = 'rewrite_print' in attrs
+        self.rewrite_print_recover = 'rewrite_print_recover' in attrs
+        self.prec_contains_expr = 'prec_contains_expr' in attrs
+        self.no_debug = 'no_debug' in attrs
+
+        self.rewrite_gen = _split_attr(attrs, 'rewrite_gen', frozenset)
+        self.rewrite_skip = _split_attr(attrs, 'rewrite_skip', frozenset)
+        self.rewrite_custom = _split_attr(attrs, 'rewrite_custom', frozenset)
+        self.rewrite_strategies = _split_attr(attrs, 'rewrite_strategies', tuple)
+        self.rewrite_extra_strategies = _split_attr(attrs, 'rewrite_extra_strategies', tuple)
+
+@functools.lru_cache(None)
+def rewrite_attrs(d):
+    return RewriteAttrs(d.attrs)
+
+@functools.lru_cache(None)
 def type_has_impl(d, trait):
-    skip = d.attrs.get('rewrite_skip')
-    if skip is not None and trait in skip.split(','):
+    pa = rewrite_attrs(d)
+
+    skip = pa.rewrite_skip
+    if skip is not None and trait in skip:
         return False
 
-    gen = d.attrs.get('rewrite_gen')
-    if gen is not None and trait in gen.split(','):
+    gen = pa.rewrite_gen
+    if gen is not None and trait in gen:
         return True
 
-    custom = d.attrs.get('rewrite_custom')
-    if custom is not None and trait in custom.split(','):
+    custom = pa.rewrite_custom
+    if custom is not None and trait in custom:
         return True
 
-    if 'rewrite_print' in d.attrs and trait in ('PrintParse', 'Splice'):
+    if pa.rewrite_print and trait in ('PrintParse', 'Splice'):
         return True
 
-    if 'rewrite_print_recover' in d.attrs and trait in ('PrintParse', 'Splice', 'Recover'):
+    if pa.rewrite_print_recover and trait in ('PrintParse', 'Splice', 'Recover'):
         return True
 
-    if 'rewrite_seq_item' in d.attrs and trait == 'SeqItem':
+    if pa.rewrite_seq_item and trait == 'SeqItem':
         return True
 
     if trait in DEFAULT_GEN_TRAITS:
@@ -235,16 +279,19 @@ def type_has_impl(d, trait):
 
     return False
 
+@functools.lru_cache(None)
 def type_needs_generated_impl(d, trait):
-    skip = d.attrs.get('rewrite_skip')
-    if skip is not None and trait in skip.split(','):
+    pa = rewrite_attrs(d)
+
+    skip = pa.rewrite_skip
+    if skip is not None and trait in skip:
         return False
 
-    gen = d.attrs.get('rewrite_gen')
-    if gen is not None and trait in gen.split(','):
+    gen = pa.rewrite_gen
+    if gen is not None and trait in gen:
         return True
 
-    if 'rewrite_seq_item' in d.attrs and trait == 'SeqItem':
+    if pa.rewrite_seq_item and trait == 'SeqItem':
         return True
 
     if trait in DEFAULT_GEN_TRAITS:
@@ -255,27 +302,47 @@ def type_needs_generated_impl(d, trait):
 
     return False
 
+# Bit flags for `trait_bits`, one per trait listed in the module docs.
+TRAITS = ('Rewrite', 'SeqItem', 'MaybeRewriteSeq', 'Recursive', 'PrintParse',
+        'Splice', 'Recover', 'RecoverChildren')
+(REWRITE, SEQ_ITEM, MAYBE_REWRITE_SEQ, RECURSIVE, PRINT_PARSE,
+        SPLICE, RECOVER, RECOVER_CHILDREN) = (1 << i for i in range(len(TRAITS)))
+
+# Traits required by the `print` strategy.
+PRINT_STRATEGY_TRAITS = PRINT_PARSE | RECOVER_CHILDREN | SPLICE
+
+@functools.lru_cache(None)
+def trait_bits(d):
+    '''Get a bitmask of the traits that have impls for `d`.  Bit `i` is set if
+    `type_has_impl(d, TRAITS[i])`.'''
+    bits = 0
+    for i, trait in enumerate(TRAITS):
+        if type_has_impl(d, trait):
+            bits |= 1 << i
+    return bits
+
+@functools.lru_cache(None)
 def get_rewrite_strategies(d):
-    strats_str = d.attrs.get('rewrite_strategies')
-    if strats_str is not None:
-        return strats_str.split(',')
+    pa = rewrite_attrs(d)
+    if pa.rewrite_strategies is not None:
+        return pa.rewrite_strategies
 
     strats = []
+    bits = trait_bits(d)
 
     if isinstance(d, Flag):
         strats.append('equal')
     else:
-        if type_has_impl(d, 'Recursive'):
+        if bits & RECURSIVE:
             strats.append('recursive')
 
-    extra_strats = d.attrs.get('rewrite_extra_strategies')
-    if extra_strats is not None:
-        strats.extend(extra_strats.split(','))
+    if pa.rewrite_extra_strategies is not None:
+        strats.extend(pa.rewrite_extra_strategies)
 
-    if all(type_has_impl(d, t) for t in ('PrintParse', 'RecoverChildren', 'Splice')):
+    if bits & PRINT_STRATEGY_TRAITS == PRINT_STRATEGY_TRAITS:
         strats.append('print')
 
-    return strats
+    return tuple(strats)
 
 @linewise
 def do_record_node_span(d, span_node, id_node, rcx):
@@ -291,63 +358,137 @@ def do_record_node_span(d, span_node, id_node, rcx):
     yield '}'
 
 
-@linewise
-def do_rewrite_impl(d):
-    if 'rewrite_ignore' in d.attrs:
-        yield '#[allow(unused)]'
-        yield 'impl Rewrite for %s {' % d.name
-        yield '  fn rewrite(old: &Self, new: &Self, mut rcx: RewriteCtxtRef) -> bool {'
-        yield '    // Rewrite mode: ignore'
-        yield '    true'
-        yield '  }'
-        yield '}'
-        return
+# Placeholder for the type name in the cached impl templates below.  The
+# generated impls differ between types mainly in the type name, so each
+# distinct template is built once and then specialized with `str.replace`.
+NAME_PLACEHOLDER = '__NAME__'
 
-    yield '#[allow(unused)]'
-    yield 'impl Rewrite for %s {' % d.name
-    yield '  fn rewrite(old: &Self, new: &Self, mut rcx: RewriteCtxtRef) -> bool {'
-    if has_field(d, 'id'):
-        yield '    trace!("{:?}: rewrite: begin (%s)", new.id);' % d.name
-    for strat in get_rewrite_strategies(d):
-        yield '    let mark = rcx.mark();'
-        if has_field(d, 'id'):
-            yield '    trace!("{:?}: rewrite: try %s", new.id);' % strat
-        yield '    let ok = strategy::%s::rewrite(old, new, rcx.borrow());' % strat
-        yield '    if ok {'
-        if has_field(d, 'id'):
-            yield '      trace!("{:?}: rewrite: %s succeeded", new.id);' % strat
-        yield '      return true;'
-        yield '    } else {'
-        if has_field(d, 'id'):
-            yield '      trace!("{:?}: rewrite: %s FAILED", new.id);' % strat
-        yield '      rcx.rewind(mark);'
-        yield '    }'
-        yield ''
-    if has_field(d, 'id'):
-        yield '    trace!("{:?}: rewrite: ran out of strategies!", new.id);'
-    yield '    false'
-    yield '  }'
-    yield '}'
-
-@linewise
-def generate_rewrite_impls(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
-    yield ''
-
-    for d in decls:
-        if type_needs_generated_impl(d, 'Rewrite'):
-            yield do_rewrite_impl(d)
+# `Rewrite` impls are shared one step further: every distinct "shape" of impl
+# (its strategy list, whether it traces `new.id`, and whether the type is
+# `#[rewrite_ignore]`) gets a `macro_rules!` definition emitted once at the top
+# of the output, and each type's impl is just an invocation of its shape's
+# macro.  This keeps the generated source small.
 
+@functools.lru_cache(None)
+def rewrite_shape(d):
+    if rewrite_attrs(d).rewrite_ignore:
+        return ((), False, True)
+    else:
+        return (get_rewrite_strategies(d), has_field(d, 'id'), False)
+
+def rewrite_impl_macro_name(shape):
+    strats, has_id, ignore = shape
+    if ignore:
+        return 'rewrite_impl_ignore'
+    name = '_'.join(('rewrite_impl',) + strats)
+    if has_id:
+        name += '_traced'
+    return name
+
+@functools.lru_cache(None)
+def rewrite_impl_macro(shape):
+    strats, has_id, ignore = shape
+    lines = []
+    lines.append('macro_rules! %s {' % rewrite_impl_macro_name(shape))
+    lines.append('  ($T:ty) => {')
+    lines.append('    #[allow(unused)]')
+    lines.append('    impl Rewrite for $T {')
+    if ignore:
+        lines.append('      fn rewrite(old: &Self, new: &Self, rcx: RewriteCtxtRef) -> bool {')
+        lines.append('        // Rewrite mode: ignore')
+        lines.append('        true')
+    elif len(strats) == 1:
+        # With only one strategy, there's no later strategy that needs the
+        # context rewound on failure - the caller rewinds it if needed.
+        strat, = strats
+        lines.append('      fn rewrite(old: &Self, new: &Self, rcx: RewriteCtxtRef) -> bool {')
+        if has_id:
+            lines.append('        trace!("{:?}: rewrite: begin ({})", new.id, stringify!($T));')
+            lines.append('        trace!("{:?}: rewrite: try %s", new.id);' % strat)
+            lines.append('        let ok = strategy::%s::rewrite(old, new, rcx);' % strat)
+            lines.append('        if ok {')
+            lines.append('          trace!("{:?}: rewrite: %s succeeded", new.id);' % strat)
+            lines.append('        } else {')
+            lines.append('          trace!("{:?}: rewrite: %s FAILED", new.id);' % strat)
+            lines.append('          trace!("{:?}: rewrite: ran out of strategies!", new.id);')
+            lines.append('        }')
+            lines.append('        ok')
+        else:
+            lines.append('        strategy::%s::rewrite(old, new, rcx)' % strat)
+    else:
+        lines.append('      fn rewrite(old: &Self, new: &Self, mut rcx: RewriteCtxtRef) -> bool {')
+        if has_id:
+            lines.append('        trace!("{:?}: rewrite: begin ({})", new.id, stringify!($T));')
+        for strat in strats:
+            lines.append('        let mark = rcx.mark();')
+            if has_id:
+                lines.append('        trace!("{:?}: rewrite: try %s", new.id);' % strat)
+            lines.append('        let ok = strategy::%s::rewrite(old, new, rcx.borrow());' % strat)
+            lines.append('        if ok {')
+            if has_id:
+                lines.append('          trace!("{:?}: rewrite: %s succeeded", new.id);' % strat)
+            lines.append('          return true;')
+            lines.append('        } else {')
+            if has_id:
+                lines.append('          trace!("{:?}: rewrite: %s FAILED", new.id);' % strat)
+            lines.append('          rcx.rewind(mark);')
+            lines.append('        }')
+            lines.append('')
+        if has_id:
+            lines.append('        trace!("{:?}: rewrite: ran out of strategies!", new.id);')
+        lines.append('        false')
+    lines.append('      }')
+    lines.append('    }')
+    lines.append('  };')
+    lines.append('}')
+    return '\n'.join(lines)
+
+def rewrite_impl_macros(shapes):
+    '''Emit the `macro_rules!` definitions for the `Rewrite` impl shapes
+    recorded by `do_rewrite_impl`.'''
+    return '\n'.join(rewrite_impl_macro(shape) for shape in shapes.values())
+
+def do_rewrite_impl(d, shapes):
+    '''Emit the `Rewrite` impl for `d`, as an invocation of its shape's macro.
+    The shape is recorded in `shapes`, an `OrderedDict` mapping macro names to
+    shapes in order of first use.'''
+    shape = rewrite_shape(d)
+    name = rewrite_impl_macro_name(shape)
+    other = shapes.setdefault(name, shape)
+    if other != shape:
+        # Strategy names are joined with `_`, so e.g. `item_header` and
+        # `item`, `header` would both produce the same macro name.
+        raise ValueError('rewrite impl shapes %r and %r both map to macro %s' %
+                (other, shape, name))
+    return '%s!(%s);' % (name, d.name)
+
+
+@functools.lru_cache(None)
+def field_outer_span_expr(f):
+    '''Get the outer span expression to use when sequence-rewriting field `f`.
+    This is computed once per field, not once per use.'''
+    expr = f.attrs.get('seq_rewrite_outer_span')
+    if expr is None:
+        return 'DUMMY_SP'
+    # Replace `self.foo` with `foo2`, since we want the *old* outer span.
+    return rewrite_field_expr(expr, '%s2')
+
+def _mk_rewrite_plain(old, new):
+    return 'Rewrite::rewrite(%s, %s, rcx.borrow())' % (old, new)
+
+def _mk_rewrite_seq(old, new, outer):
+    return 'rewrite_seq(%s, %s, %s, rcx.borrow())' % (old, new, outer)
 
-@linewise
 def do_recursive_body(se, target1, target2):
-    contains_expr = 'prec_contains_expr' in se.attrs
+    lines = []
+    contains_expr = rewrite_attrs(se).prec_contains_expr
 
-    yield 'match (%s, %s) {' % (target1, target2)
+    lines.append('match (%s, %s) {' % (target1, target2))
     for v, path in variants_paths(se):
-        yield '  (&%s,' % struct_pattern(v, path, '1')
-        yield '   &%s) => {' % struct_pattern(v, path, '2')
+        pat1 = struct_pattern(v, path, '1')
+        pat2 = struct_pattern(v, path, '2')
+        lines.append('  (&%s,' % pat1)
+        lines.append('   &%s) => {' % pat2)
 
         for f in v.fields:
             if 'rewrite_ignore' in f.attrs:
@@ -358,64 +499,59 @@ def do_recursive_body(se, target1, target2):
             if seq_rewrite_mode is None and 'seq_rewrite_outer_span' in f.attrs:
                 seq_rewrite_mode = ''   # enabled, default mode
 
+            prec_first = 'prec_first' in f.attrs
+            if prec_first:
+                prec_first_expr = field_prec_expr(f, True)
+            if prec_first or contains_expr:
+                prec_rest_expr = field_prec_expr(f, False)
+
+            if prec_first:
+                old, new = '&%s1[1..]' % f.name, '&%s2[1..]' % f.name
+            else:
+                old, new = '%s1' % f.name, '%s2' % f.name
             if seq_rewrite_mode is None:
-                mk_rewrite = lambda old, new: \
-                        'Rewrite::rewrite({old}, {new}, rcx.borrow())'.format(
-                                old=old, new=new)
+                rewrite_expr = _mk_rewrite_plain(old, new)
             else:
-                outer_span_expr = f.attrs.get('seq_rewrite_outer_span')
-                if outer_span_expr is not None:
-                    # Replace `self.foo` with `foo2`, since we want the *old*
-                    # outer span.
-                    outer_span_expr = rewrite_field_expr(outer_span_expr, '%s2')
-                else:
-                    outer_span_expr = 'DUMMY_SP'
-                mk_rewrite = lambda old, new: \
-                        'rewrite_seq({old}, {new}, {outer}, rcx.borrow())'.format(
-                                old=old, new=new, outer=outer_span_expr)
-
+                rewrite_expr = _mk_rewrite_seq(old, new, field_outer_span_expr(f))
 
             # Generate the code for the recursive call, including expr
             # precedence bookkeeping.
-            yield '    ({'
-
-            if 'prec_first' in f.attrs:
-                yield '      let old = rcx.replace_expr_prec(%s);' % \
-                        field_prec_expr(f, True)
-                yield '      let ok = Rewrite::rewrite(&%s1[0], &%s2[0], ' \
-                        'rcx.borrow());' % (f.name, f.name)
-                yield '      rcx.replace_expr_prec(%s);' % field_prec_expr(f, False)
-                rewrite_expr = mk_rewrite('&%s1[1..]' % f.name, '&%s2[1..]' % f.name)
-                yield '      let ok = ok && %s;' % rewrite_expr
-                yield '      rcx.replace_expr_prec(old);'
-                yield '      ok'
+            lines.append('    ({')
+
+            if prec_first:
+                lines.append('      let old = rcx.replace_expr_prec(%s);' % prec_first_expr)
+                lines.append('      let ok = Rewrite::rewrite(&%s1[0], &%s2[0], '
+                        'rcx.borrow());' % (f.name, f.name))
+                lines.append('      rcx.replace_expr_prec(%s);' % prec_rest_expr)
+                lines.append('      let ok = ok && %s;' % rewrite_expr)
+                lines.append('      rcx.replace_expr_prec(old);')
+                lines.append('      ok')
             else:
                 if contains_expr:
-                    yield '      let old = rcx.replace_expr_prec(%s);' % \
-                            field_prec_expr(f, False)
-                rewrite_expr = mk_rewrite('%s1' % f.name, '%s2' % f.name)
-                yield '      let ok = %s;' % rewrite_expr
+                    lines.append('      let old = rcx.replace_expr_prec(%s);' % prec_rest_expr)
+                lines.append('      let ok = %s;' % rewrite_expr)
                 if contains_expr:
-                    yield '      rcx.replace_expr_prec(old);'
-                yield '      ok'
+                    lines.append('      rcx.replace_expr_prec(old);')
+                lines.append('      ok')
 
-            yield '    }) &&'
+            lines.append('    }) &&')
 
-        yield '    true'
-        yield '  }'
-    yield '  (_, _) => false,'
-    yield '}'
+        lines.append('    true')
+        lines.append('  }')
+    lines.append('  (_, _) => false,')
+    lines.append('}')
+    return '\n'.join(lines)
 
 @linewise
 def do_recursive_impl(d):
-    if 'rewrite_ignore' in d.attrs:
+    if rewrite_attrs(d).rewrite_ignore:
         yield '#[allow(unused)]'
         yield 'impl Recursive for %s {' % d.name
         yield '  fn recursive(old: &Self, new: &Self, mut rcx: RewriteCtxtRef) -> bool {'
         # Record `new`'s ID at `old`'s span.  A successful `recursive` rewrite
         # means that `old` and `new` are identical, and `old`'s text is a valid
         # rendering of `new`.
-        yield indent(do_record_node_span(d, 'old', 'new', 'rcx'), '    ')
+        yield indent_block(do_record_node_span(d, 'old', 'new', 'rcx'), '    ')
         yield '    true'
         yield '  }'
         yield '}'
@@ -425,62 +561,58 @@ def do_recursive_impl(d):
     yield '  fn recursive(old: &Self, new: &Self, mut rcx: RewriteCtxtRef) -> bool {'
     # Optimistically record the span.  If match in `do_recursive_body` fails,
     # the caller will rewind `rcx`, removing the recorded span.
-    yield indent(do_record_node_span(d, 'old', 'new', 'rcx'), '    ')
-    yield indent(do_recursive_body(d, 'old', 'new'), '    ')
+    yield indent_block(do_record_node_span(d, 'old', 'new', 'rcx'), '    ')
+    yield indent_block(do_recursive_body(d, 'old', 'new'), '    ')
     yield '  }'
     yield '}'
 
-@linewise
-def generate_recursive_impls(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
-    yield ''
-
-    for d in decls:
-        if type_needs_generated_impl(d, 'Recursive'):
-            yield do_recursive_impl(d)
 
-
-@linewise
 def do_recover_children_match(d):
-    if not isinstance(d, (Struct, Enum)) or 'rewrite_ignore' in d.attrs:
-        return
+    if not isinstance(d, (Struct, Enum)) or rewrite_attrs(d).rewrite_ignore:
+        return ''
 
-    contains_expr = 'prec_contains_expr' in d.attrs
+    lines = []
+    contains_expr = rewrite_attrs(d).prec_contains_expr
 
-    yield 'match (reparsed, new) {'
+    lines.append('match (reparsed, new) {')
     for v, path in variants_paths(d):
-        yield '  (&%s,' % struct_pattern(v, path, '_r')
-        yield '   &%s) => {' % struct_pattern(v, path, '_n')
+        pat1 = struct_pattern(v, path, '_r')
+        pat2 = struct_pattern(v, path, '_n')
+        lines.append('  (&%s,' % pat1)
+        lines.append('   &%s) => {' % pat2)
         for f in v.fields:
             if 'rewrite_ignore' in f.attrs:
                 continue
 
-            if 'prec_first' in f.attrs:
-                yield '    let old = rcx.replace_expr_prec(%s);' % \
-                        field_prec_expr(f, True, suffix='_n')
-                yield '    RecoverChildren::recover_node_and_children(' \
-                        '&%s_r[0], &%s_n[0], rcx.borrow());' % (f.name, f.name)
-                yield '    rcx.replace_expr_prec(%s);' % \
-                        field_prec_expr(f, False, suffix='_n')
-                yield '    RecoverChildren::recover_node_and_children(' \
-                        '&%s_r[1..], &%s_n[1..], rcx.borrow());' % (f.name, f.name)
-                yield '    rcx.replace_expr_prec(old);'
+            prec_first = 'prec_first' in f.attrs
+            if prec_first:
+                prec_first_expr = field_prec_expr(f, True, suffix='_n')
+            if prec_first or contains_expr:
+                prec_rest_expr = field_prec_expr(f, False, suffix='_n')
+
+            if prec_first:
+                lines.append('    let old = rcx.replace_expr_prec(%s);' % prec_first_expr)
+                lines.append('    RecoverChildren::recover_node_and_children('
+                        '&%s_r[0], &%s_n[0], rcx.borrow());' % (f.name, f.name))
+                lines.append('    rcx.replace_expr_prec(%s);' % prec_rest_expr)
+                lines.append('    RecoverChildren::recover_node_and_children('
+                        '&%s_r[1..], &%s_n[1..], rcx.borrow());' % (f.name, f.name))
+                lines.append('    rcx.replace_expr_prec(old);')
             else:
                 if contains_expr:
-                    yield '    let old = rcx.replace_expr_prec(%s);' % \
-                            field_prec_expr(f, False, suffix='_n')
-                yield '    RecoverChildren::recover_node_and_children(' \
-                        '%s_r, %s_n, rcx.borrow());' % (f.name, f.name)
+                    lines.append('    let old = rcx.replace_expr_prec(%s);' % prec_rest_expr)
+                lines.append('    RecoverChildren::recover_node_and_children('
+                        '%s_r, %s_n, rcx.borrow());' % (f.name, f.name))
                 if contains_expr:
-                    yield '    rcx.replace_expr_prec(old);'
+                    lines.append('    rcx.replace_expr_prec(old);')
 
-        yield '  },'
-    if 'no_debug' in d.attrs:
-        yield '  _ => panic!("new and reparsed ASTs don\'t match"),'
+        lines.append('  },')
+    if rewrite_attrs(d).no_debug:
+        lines.append('  _ => panic!("new and reparsed ASTs don\'t match"),')
     else:
-        yield '  _ => panic!("new and reparsed ASTs don\'t match: {:?} != {:?}", new, reparsed),'
-    yield '}'
+        lines.append('  _ => panic!("new and reparsed ASTs don\'t match: {:?} != {:?}", new, reparsed),')
+    lines.append('}')
+    return '\n'.join(lines)
 
 @linewise
 def do_recover_children_impl(d):
@@ -489,8 +621,8 @@ def do_recover_children_impl(d):
     yield '#[allow(unused)]'
     yield 'impl RecoverChildren for %s {' % d.name
     yield '  fn recover_children(reparsed: &Self, new: &Self, mut rcx: RewriteCtxtRef) {'
-    yield indent(do_record_node_span(d, 'reparsed', 'new', 'rcx'), '    ')
-    yield indent(do_recover_children_match(d), '    ')
+    yield indent_block(do_record_node_span(d, 'reparsed', 'new', 'rcx'), '    ')
+    yield indent_block(do_recover_children_match(d), '    ')
     yield '  }'
     yield '  fn recover_node_and_children(reparsed: &Self, new: &Self, mut rcx: RewriteCtxtRef) {'
     if impl_recover:
@@ -508,42 +640,27 @@ def do_recover_children_impl(d):
     yield '  }'
     yield '}'
 
-@linewise
-def generate_recover_children_impls(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
-    yield ''
-
-    for d in decls:
-        if type_needs_generated_impl(d, 'RecoverChildren'):
-            yield do_recover_children_impl(d)
-
 
+@functools.lru_cache(None)
 @linewise
-def do_seq_item_impl(d):
+def seq_item_impl_template():
+    name = NAME_PLACEHOLDER
     yield '#[allow(unused)]'
-    yield 'impl SeqItem for %s {' % d.name
+    yield 'impl SeqItem for %s {' % name
     yield '  fn seq_item_id(&self) -> SeqItemId {'
     yield '    SeqItemId::Node(self.id)'
     yield '  }'
     yield '}'
 
-@linewise
-def generate_seq_item_impls(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
-    yield ''
-
-    for d in decls:
-        if type_needs_generated_impl(d, 'SeqItem'):
-            yield do_seq_item_impl(d)
+def do_seq_item_impl(d):
+    return seq_item_impl_template().replace(NAME_PLACEHOLDER, d.name)
 
 
+@functools.lru_cache(None)
 @linewise
-def do_maybe_rewrite_seq_impl(d):
-    supported = type_has_impl(d, 'SeqItem')
-
-    for ty in (d.name, 'P<%s>' % d.name):
+def maybe_rewrite_seq_impl_template(supported):
+    name = NAME_PLACEHOLDER
+    for ty in (name, 'P<%s>' % name):
         yield '#[allow(unused)]'
         yield 'impl MaybeRewriteSeq for %s {' % ty
         if supported:
@@ -551,17 +668,57 @@ def do_maybe_rewrite_seq_impl(d):
             yield '                       new: &[Self],'
             yield '                       outer_span: Span,'
             yield '                       rcx: RewriteCtxtRef) -> bool {'
-            yield '    trace!("try sequence rewriting for %s");' % d.name
+            yield '    trace!("try sequence rewriting for %s");' % name
             yield '    rewrite_seq(old, new, outer_span, rcx)'
             yield '  }'
         yield '}'
 
-@linewise
-def generate_maybe_rewrite_seq_impls(decls):
-    yield '// AUTOMATICALLY GENERATED - DO NOT EDIT'
-    yield '// Produced %s by process_ast.py' % (datetime.now(),)
-    yield ''
+def do_maybe_rewrite_seq_impl(d):
+    supported = type_has_impl(d, 'SeqItem')
+    return maybe_rewrite_seq_impl_template(supported).replace(NAME_PLACEHOLDER, d.name)
+
+
+# Generated impl kinds, as (key, trait, emitter) triples.  The key is used to
+# name the output file (`rewrite_<key>_gen.inc.rs`).
+IMPL_KINDS = (
+    ('rewrite', 'Rewrite', do_rewrite_impl),
+    ('recursive', 'Recursive', do_recursive_impl),
+    ('recover_children', 'RecoverChildren', do_recover_children_impl),
+    ('seq_item', 'SeqItem', do_seq_item_impl),
+    ('maybe_rewrite_seq', 'MaybeRewriteSeq', do_maybe_rewrite_seq_impl),
+)
+
+def emit_all_impls(decls):
+    '''Emit the impls of each kind in `IMPL_KINDS` for `decls`.  Returns a dict
+    mapping each key to the concatenated impls, each preceded by a newline,
+    and the `Rewrite` impl shapes recorded by `do_rewrite_impl`.'''
+    # Each output is accumulated in its own `StringIO`, rather than as a list
+    # of impls to be joined at the end.
+    bufs = {key: io.StringIO() for key, _, _ in IMPL_KINDS}
+    rewrite_shapes = OrderedDict()
 
     for d in decls:
-        if type_needs_generated_impl(d, 'MaybeRewriteSeq'):
-            yield do_maybe_rewrite_seq_impl(d)
+        for key, trait, emit in IMPL_KINDS:
+            if type_needs_generated_impl(d, trait):
+                w = bufs[key].write
+                w('\n')
+                if emit is do_rewrite_impl:
+                    w(emit(d, rewrite_shapes))
+                else:
+                    w(emit(d))
+
+    return {key: buf.getvalue() for key, buf in bufs.items()}, rewrite_shapes
+
+def generate_all_impls(decls):
+    '''Generate all five kinds of impls in a single pass over `decls`.
+    Returns a dict mapping each key in `IMPL_KINDS` to the full contents of
+    its output file.  Callers that want a single kind can take its entry.'''
+    impls, rewrite_shapes = emit_all_impls(decls)
+
+    # The `Rewrite` impls invoke macros, whose definitions must come first.
+    preludes = {'rewrite': '\n' + rewrite_impl_macros(rewrite_shapes) + '\n'}
+
+    outputs = {}
+    for key, _, _ in IMPL_KINDS:
+        outputs[key] = GENERATED_HEADER + '\n' + preludes.get(key, '') + impls[key]
+    return outputs
@@ -2,6 +2,13 @@ import functools
 import re
 
 
+# Header for generated files.  This intentionally omits a timestamp, so that
+# regenerating from unchanged inputs produces byte-identical output.
+GENERATED_HEADER = '''\
+// AUTOMATICALLY GENERATED - DO NOT EDIT
+// Produced by process_ast.py'''
+
+
 def linewise(f):
     @functools.wraps(f)
     def g(*args, **kwargs):
@@ -20,6 +27,14 @@ def wordwise(f):
         return ' '.join(f(*args, **kwargs))
     return g
 
+def indent_block(s, prefix):
+    '''Add `prefix` to the start of every line of `s`.  This is a faster
+    `textwrap.indent` for generated code that contains no blank lines.  An
+    empty `s` is returned unchanged.'''
+    if not s:
+        return s
+    return prefix + s.replace('\n', '\n' + prefix)
+
 
 @comma_sep
 def struct_fields(fields, suffix, bind_mode):
@@ -31,6 +46,7 @@ def tuple_fields(fields, suffix, bind_mode):
     for f in fields:
         yield '%s%s%s' % (bind_mode, f.name, suffix)
 
+@functools.lru_cache(None)
 def struct_pattern(s, path, suffix='', bind_mode='ref '):
     if not s.is_tuple:
         return '%s { %s }' % (path, struct_fields(s.fields, suffix, bind_mode))